@@ -1,8 +1,72 @@
-import geopy.point
-import geopy.distance
+import numpy as np
+import math
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pickle
+import shelve
+import sqlite3
+import dbm
 import os
+import time
+import atexit
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# orjson (if it is installed) decodes the google API responses faster than the standard json module
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    import json
+    _json_loads = json.loads
+
+# Maximum number of retries of a google API request that failed with a transient error
+_MAX_RETRIES = 5
+
+# Google API statuses of transient errors (the request is retried with exponential backoff)
+_RETRY_STATUSES = ('OVER_QUERY_LIMIT', 'UNKNOWN_ERROR')
+
+# Number of connections kept alive by the shared session (it is also the maximum max_workers allowed)
+_POOL_SIZE = 32
+
+# Session shared by all the google API requests (keeps the connections alive between requests)
+# HTTP 429 and 5xx responses are retried with exponential backoff by the adapter
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=_POOL_SIZE, pool_maxsize=_POOL_SIZE, \
+                                       max_retries=Retry(total=_MAX_RETRIES, \
+                                                         backoff_factor=0.5, \
+                                                         status_forcelist=[429, 500, 502, 503, 504], \
+                                                         allowed_methods=['GET'], \
+                                                         raise_on_status=False)))
+
+# Google API endpoints
+# (the query strings are built from params dictionaries by requests)
+_NEARBY_SEARCH_URL = 'https://maps.googleapis.com/maps/api/place/nearbysearch/json'
+_PLACE_DETAILS_URL = 'https://maps.googleapis.com/maps/api/place/details/json'
+
+# Timeout (in seconds) of each google API request
+_TIMEOUT = 10
+
+# Default number of google API requests in flight at the same time
+_MAX_WORKERS = 10
+
+# Number of threads used to load the .pkl files of a folder
+_LOAD_WORKERS = 16
+
+# Name of the store (inside the folder given by the user) where data_from_ids_to_files() saves the places
+_STORE_NAME = 'places'
+
+# A grid point is considered covered by a requested point if it is closer to it than this fraction of 
+# the distance to the farthest place returned for the requested point (see get_ids_from_grid())
+_COVERED_RATIO = 0.7
+
+# Persistent cache of the google API responses (disabled by default, see enable_cache())
+# It is a sqlite connection shared by the threads that perform the requests, so every access holds _CACHE_LOCK
+_CACHE = None
+_CACHE_EXPIRE_AFTER = None
+_CACHE_LOCK = threading.Lock()
 
 class RequestError(Exception):
     def __init__(self, message):
@@ -11,19 +75,168 @@ class RequestError(Exception):
     def __str__(self):
         return f"RequestError: {self.message}"
 
-def request_check(response: requests.models.Response):
-    status = response.json()['status']
+def request_check(data: dict):
+    status = data['status']
     if status != 'OK' and status != 'ZERO_RESULTS':
         raise RequestError("Google API returned the following status: "+status) 
 
+def _check_max_workers(max_workers: int):
+
+    """Raises a ValueError if max_workers is not between 1 and the size of the connection pool of the shared 
+    session (more concurrent requests would open connections that are discarded instead of kept alive)."""
+
+    if not 1 <= max_workers <= _POOL_SIZE:
+        raise ValueError(f"max_workers must be between 1 and {_POOL_SIZE}, got {max_workers}")
+
+def enable_cache(file_name: str, expire_after: float = 7*24*3600):
+
+    """Enables a persistent cache of the google API responses. While the cache is enabled, a request that 
+    was already successfully performed (in this or in a previous run) is answered from the cache instead 
+    of being sent to google again, so repeated runs over overlapping grids or ids do not spend API quota.
+
+    Args:
+        file_name (str): Path of the file where the cache is stored (it is created if it does not exist).
+        expire_after (float): Seconds after which a cached response is requested again. It is one week by default.
+    """
+
+    global _CACHE, _CACHE_EXPIRE_AFTER
+    disable_cache()
+    with _CACHE_LOCK:
+        #The connection is used from the threads of the request functions (check_same_thread=False),
+        #the accesses are serialized with _CACHE_LOCK
+        _CACHE = sqlite3.connect(file_name, check_same_thread=False)
+        _CACHE.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, timestamp REAL, data BLOB)')
+        _CACHE.commit()
+        _CACHE_EXPIRE_AFTER = expire_after
+
+def disable_cache():
+
+    """Disables the cache enabled by enable_cache(). The responses already cached are kept in the cache file."""
+
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is not None:
+            _CACHE.close()
+            _CACHE = None
+
+atexit.register(disable_cache)
+
+def _get(url: str, params: dict, cache_key: str, payload: dict, headers: dict) -> dict:
+
+    """Performs a GET request to the google API with the shared session, using the cache if it is enabled.
+    cache_key identifies the request in the cache (it must not depend on the API key).
+    Returns the response parsed as a dictionary (the json is parsed only once per request)."""
+
+    with _CACHE_LOCK:
+        if _CACHE is not None:
+            row = _CACHE.execute('SELECT timestamp, data FROM responses WHERE key = ?', (cache_key,)).fetchone()
+            if row is not None and time.time() - row[0] < _CACHE_EXPIRE_AFTER:
+                return pickle.loads(row[1])
+
+    #Google answers with a transient error status when the requests are rate limited, 
+    #so these requests are retried waiting 1, 2, 4, ... seconds
+    for attempt in range(_MAX_RETRIES+1):
+        response = _SESSION.get(url, params=params, headers=headers, data=payload, timeout=_TIMEOUT)
+        data = _json_loads(response.content)
+        if attempt == _MAX_RETRIES or not response.ok or data['status'] not in _RETRY_STATUSES:
+            break
+        time.sleep(2**attempt)
+
+    #Only the successful responses are cached
+    with _CACHE_LOCK:
+        if _CACHE is not None and response.ok:
+            try:
+                request_check(data)
+            except RequestError:
+                return data
+            _CACHE.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?)', \
+                           (cache_key, time.time(), pickle.dumps(data)))
+            _CACHE.commit()
+
+    return data
+
+def _nearby_search_request(point: tuple[float,float], \
+                           place_type: str, \
+                           API_key: str, \
+                           payload: dict, \
+                           headers: dict) -> dict:
+
+    """Performs the Nearby Search API request of a single point of a grid."""
+
+    #Specifying latitude and longitude
+    location = f'{point[0]},{point[1]}'
+
+    #API request
+    params = {'location': location, 'type': place_type, 'rankby': 'distance', 'key': API_key}
+    return _get(_NEARBY_SEARCH_URL, params, f'nearbysearch {location} {place_type}', payload, headers)
+
+def _place_details_request(id: str, \
+                           API_key: str, \
+                           payload: dict, \
+                           headers: dict, \
+                           fields: list[str] = None) -> dict:
+
+    """Performs the Place Details API request of a single place id (requesting only the given fields, if any)."""
+
+    params = {'place_id': id, 'key': API_key}
+    cache_key = f'details {id}'
+    if fields is not None:
+        params['fields'] = ','.join(fields)
+        cache_key += f" {params['fields']}"
+    return _get(_PLACE_DETAILS_URL, params, cache_key, payload, headers)
+
+def _haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+
+    """Returns the great-circle distance between two points given by their latitude and longitude 
+    (in degrees). The earth is approximated by a sphere of radius 6371.0088 km (the mean earth radius).
+
+    Args:
+        lat1 (float): Latitude of the first point
+        lon1 (float): Longitude of the first point
+        lat2 (float): Latitude of the second point
+        lon2 (float): Longitude of the second point
+
+    Returns:
+        float: Distance between the two points (in kilometers)
+    """
+
+    R = 6371.0088
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dlambda/2)**2
+    return 2*R*math.asin(math.sqrt(a))
+
+def _haversine_vector(lat1: float, lon1: float, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+
+    """Vectorized version of _haversine(). Returns the distances (in kilometers) from the point (lat1, lon1) 
+    to each of the points given by the arrays lat2 and lon2."""
+
+    R = 6371.0088
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = np.radians(lon2 - lon1)
+    a = np.sin(dphi/2)**2 + np.cos(phi1)*np.cos(phi2)*np.sin(dlambda/2)**2
+    return 2*R*np.arcsin(np.sqrt(a))
+
+def _covered(point: tuple[float,float], disks: np.ndarray) -> bool:
+
+    """Returns True if the point is inside any of the disks scaled by _COVERED_RATIO. disks is an array 
+    of shape (number of disks, 3) with the latitude, longitude and radius (in kilometers) of each disk."""
+
+    distances = _haversine_vector(point[0], point[1], disks[:,0], disks[:,1])
+    return bool(np.any(distances < _COVERED_RATIO*disks[:,2]))
+
 def gridMaker(center_lat_lon: tuple[float,float], \
               top_left_lat_lon: tuple[float,float], \
               bottom_right_lat_lon: tuple[float,float], \
               x_step: float, \
-              y_step: float) -> list[tuple[float,float]]:    
+              y_step: float) -> np.ndarray:    
     
     """Returns a grid of points where center, top_left, and bottom_right are three of the four vertexes 
-    of the parallelogram (each point is specified with its latitude and its longitude as a tuple). 
+    of the parallelogram (each vertex is specified with its latitude and its longitude as a tuple). 
     step_x and step_y are the distance between the points in the grid.
     
     Args:
@@ -36,52 +249,60 @@ def gridMaker(center_lat_lon: tuple[float,float], \
                         The y axis is the one defined by the center and the top_left points
 
     Returns:
-        list[tuple[float,float]]: The grid. List of tuples. Each tuple are the latitude and
-                                  the longitude of a point in the grid
+        np.ndarray: The grid. Array of shape (number of points, 2) and dtype float64. Each row are the latitude 
+                    and the longitude of a point in the grid. It can be passed directly to the functions of this 
+                    library that take a grid (use grid.tolist() to get a list of [latitude, longitude] lists)
     """    
 
-    # Creating the geopy points
-    center = geopy.point.Point(center_lat_lon[0],center_lat_lon[1])
-    top_left = geopy.point.Point(top_left_lat_lon[0],top_left_lat_lon[1])
-    bottom_right = geopy.point.Point(bottom_right_lat_lon[0],bottom_right_lat_lon[1])
+    # Unpacking the vertexes
+    center_lat, center_lon = center_lat_lon
+    top_left_lat, top_left_lon = top_left_lat_lon
+    bottom_right_lat, bottom_right_lon = bottom_right_lat_lon
 
     # Steps in kilometers
     x_step = x_step / 1000
     y_step = y_step / 1000
 
     # Compute vector_x and vector_y coordinates
-    vector_x_lat = bottom_right.latitude - center.latitude
-    vector_x_lon = bottom_right.longitude - center.longitude
-    vector_y_lat = top_left.latitude - center.latitude
-    vector_y_lon = top_left.longitude - center.longitude
+    vector_x_lat = bottom_right_lat - center_lat
+    vector_x_lon = bottom_right_lon - center_lon
+    vector_y_lat = top_left_lat - center_lat
+    vector_y_lon = top_left_lon - center_lon
 
     # Compute the number of points in the grid according to the steps
-    vx_norm = geopy.distance.geodesic(center, bottom_right).kilometers
-    vy_norm = geopy.distance.geodesic(center, top_left).kilometers
+    vx_norm = _haversine(center_lat, center_lon, bottom_right_lat, bottom_right_lon)
+    vy_norm = _haversine(center_lat, center_lon, top_left_lat, top_left_lon)
     num_points_x = vx_norm/x_step
     num_points_y = vy_norm/y_step
-    
-    # Compute the grid of points
-    grid = [] 
-    npx = int(num_points_x)
-    npy = int(num_points_y)
-    for i in range(npx+1):
-        for j in range(npy+1):
-            latitude = center.latitude + \
-                       (i/npx)*vector_x_lat + \
-                       (j/npy)*vector_y_lat
-            longitude = center.longitude + \
-                       (i/npx)*vector_x_lon + \
-                       (j/npy)*vector_y_lon
-            grid.append((latitude, longitude))
-            
+
+    # Compute the grid of points (i and j are broadcast to a (npx+1)x(npy+1) array)
+    # An axis shorter than half its step is collapsed to the center (a single row or column, 
+    # so if both axes are collapsed the grid is only the center). An axis shorter than its step 
+    # but longer than half of it has its two vertexes
+    if vx_norm < x_step/2:
+        i = np.zeros((1,1))
+    else:
+        npx = max(int(num_points_x), 1)
+        i = np.arange(npx+1)[:,None] / npx
+    if vy_norm < y_step/2:
+        j = np.zeros((1,1))
+    else:
+        npy = max(int(num_points_y), 1)
+        j = np.arange(npy+1)[None,:] / npy
+    latitudes = center_lat + i*vector_x_lat + j*vector_y_lat
+    longitudes = center_lon + i*vector_x_lon + j*vector_y_lon
+    grid = np.column_stack([latitudes.ravel(), longitudes.ravel()])
+
     return grid
 
 def get_ids_from_grid(grid: list[tuple[float,float]], \
                       place_type: str, \
                       API_key: str, \
-                      payload: dict = {}, \
-                      headers: dict = {}) -> list[str]:
+                      payload: dict = None, \
+                      headers: dict = None, \
+                      max_workers: int = _MAX_WORKERS, \
+                      max_ids: int = None, \
+                      skip_covered: bool = False) -> list[str]:
 
     """Given a grid with coordinates (tuples of floats with latitude and longitude data) this function performs
     an API request to Google Maps in order to obtain the 20 closer points of interest (specified by the
@@ -90,49 +311,101 @@ def get_ids_from_grid(grid: list[tuple[float,float]], \
     function if you want the errors during the google API requests being handled.
     
     Args:
-        grid (list of float tuples): List with coordinates (latitude, longitude)
+        grid (list of float tuples or np.ndarray): List with coordinates (latitude, longitude), like the grid returned by gridMaker()
         place_type (str): Type of places of interest (for instance 'restaurant' or 'hospital')
                           See full list of available place types in this link (link working on August 2023):
                           https://developers.google.com/maps/documentation/places/web-service/supported_types#table2
         API_key (str): API key used to perform Nearby Search API requests.
-        payload (dict): Payload used to perform Nearby Search API requests. It is an empty dictionary by default.
-        headers (dict): Headers used to perform Nearby Search API requests. It is an empty dictionary by default.
+        payload (dict): Payload used to perform Nearby Search API requests. It is None (no payload) by default.
+        headers (dict): Headers used to perform Nearby Search API requests. It is None (no headers) by default.
+        max_workers (int): Maximum number of API requests performed at the same time (at most 32). It is 10 by default.
+        max_ids (int): If it is given, no more points of the grid are requested once at least max_ids unique 
+                       ids have been collected (following the grid order). At most max_workers requests are 
+                       in flight at the same time, so up to max_workers-1 requests may still be completed after 
+                       that. It is None (all the grid) by default.
+        skip_covered (bool): If it is True, the points of the grid that are close to an already requested point 
+                             (closer than 0.7 times the distance from the requested point to the farthest place 
+                             returned for it) are not requested, since they would return almost the same places. 
+                             This saves many requests on dense grids, at the risk of missing a few places. 
+                             At most max_workers requests are then in flight at the same time. It is False by default.
 
     Returns:
         list[str]: List of place ids as a string.
     """  
 
-    #Creating the list to save the places IDs
-    list_of_id = []
+    #No payload and no headers by default
+    payload = {} if payload is None else payload
+    headers = {} if headers is None else headers
+    _check_max_workers(max_workers)
 
-    #Performing request and keeping data for any location in the grid
-    for point in grid:
+    #Creating the set to save the places IDs (duplicates are discarded as they are found)
+    set_of_id = set()
 
-        #Specifying latitude and longitude
-        lat = str(point[0])
-        lon = str(point[1])
+    #Disks (latitude, longitude and radius in kilometers) covered by the requested points (used if skip_covered is True)
+    #The first num_disks rows of the array are used, its size is doubled when it is full
+    disks = np.empty((64, 3))
+    num_disks = 0
 
-        #API request
-        url = f'https://maps.googleapis.com/maps/api/place/nearbysearch/json?location={lat}%2C{lon}&type={place_type}&rankby=distance&key={API_key}'
-        response = requests.request("GET", url, headers=headers, data=payload)
-        request_check(response)
+    #Points of the grid not dispatched yet and requests in flight (pairs of point and future)
+    points = iter(grid)
+    in_flight = deque()
 
-        #Getting the requested data as a dictionary
-        dict = response.json()
+    #Without max_ids and skip_covered all the grid is dispatched at once. Otherwise at most max_workers
+    #requests are in flight, so the next points are checked against the disks of the responses already 
+    #processed and no more points are dispatched once enough ids were collected
+    window = max_workers if (skip_covered or max_ids is not None) else None
 
-        #Saving the ID of the places obtained from the requested data
-        places = dict['results'] #This is a list of dictionaries, each of them containing info on a specific place
-        for place in places:
-            list_of_id.append(place["place_id"])
+    #Performing request and keeping data for any location in the grid
+    #(the requests are performed concurrently, the responses are processed in the grid order)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while True:
+            #Dispatching the next points of the grid
+            while window is None or len(in_flight) < window:
+                point = next(points, None)
+                if point is None:
+                    break
+                if skip_covered and _covered(point, disks[:num_disks]):
+                    continue
+                in_flight.append((point, executor.submit(_nearby_search_request, point, place_type, API_key, payload, headers)))
+            if not in_flight:
+                break
+
+            point, future = in_flight.popleft()
+            data = future.result()
+            request_check(data)
+
+            #Saving the ID of the places obtained from the requested data
+            places = data['results'] #This is a list of dictionaries, each of them containing info on a specific place
+            set_of_id.update(place["place_id"] for place in places)
+
+            #The places returned for the point are the closest ones, so the point covers the disk
+            #that reaches the farthest of them
+            if skip_covered and places:
+                places_lat = np.array([place['geometry']['location']['lat'] for place in places])
+                places_lon = np.array([place['geometry']['location']['lng'] for place in places])
+                radius = _haversine_vector(point[0], point[1], places_lat, places_lon).max()
+                if num_disks == len(disks):
+                    disks = np.concatenate([disks, np.empty_like(disks)])
+                disks[num_disks] = (point[0], point[1], radius)
+                num_disks += 1
+
+            #Enough unique ids were collected
+            if max_ids is not None and len(set_of_id) >= max_ids:
+                break
+    finally:
+        #Do not perform the pending requests (if a request failed or enough ids were collected)
+        executor.shutdown(cancel_futures=True)
     
-    return list(set(list_of_id))
+    return list(set_of_id)
 
 def ids_to_file_from_grid(grid: list[tuple[float,float]], \
                       place_type: str, \
                       file_name: str, \
                       API_key: str, \
-                      payload: dict = {}, \
-                      headers: dict = {}) -> list[tuple[float,float]]:
+                      payload: dict = None, \
+                      headers: dict = None, \
+                      max_workers: int = _MAX_WORKERS) -> list[tuple[float,float]]:
 
     """Given a grid with coordinates (tuples of floats with latitude and longitude data) this function performs
     an API request to Google Maps in order to obtain the 20 closer points of interest (specified by the
@@ -140,52 +413,56 @@ def ids_to_file_from_grid(grid: list[tuple[float,float]], \
     where there were problems making the google API request.
     
     Args:
-        grid (list of float tuples): List with coordinates (latitude, longitude)
+        grid (list of float tuples or np.ndarray): List with coordinates (latitude, longitude), like the grid returned by gridMaker()
         place_type (str): Type of places of interest (for instance 'restaurant' or 'hospital')
                           See full list of available place types in this link (link working on August 2023):
                           https://developers.google.com/maps/documentation/places/web-service/supported_types#table2
         file_name (str): Path of the file were the ids will be stored.
         API_key (str): API key used to perform Nearby Search API requests.
-        payload (dict): Payload used to perform Nearby Search API requests. It is an empty dictionary by default.
-        headers (dict): Headers used to perform Nearby Search API requests. It is an empty dictionary by default.
+        payload (dict): Payload used to perform Nearby Search API requests. It is None (no payload) by default.
+        headers (dict): Headers used to perform Nearby Search API requests. It is None (no headers) by default.
+        max_workers (int): Maximum number of API requests performed at the same time (at most 32). It is 10 by default.
     
     Returns:
         list of float tuples: List of coordinates (latitude and longitude) of the points of the grid where there were
         problems making the google API request.
     """  
 
-    # Open the file in write mode and truncate it
-    with open(file_name, 'w') as file:
-        file.truncate()
+    #No payload and no headers by default
+    payload = {} if payload is None else payload
+    headers = {} if headers is None else headers
+    _check_max_workers(max_workers)
 
     #Performing request and keeping data for any location in the grid
+    #(the requests are performed concurrently, the responses are processed in the grid order)
+    #(the file is opened once in write mode, so it is truncated, before any request is performed)
     error_points = []
-    for i, point in enumerate(grid):
-
-        #Specifying latitude and longitude
-        lat = str(point[0])
-        lon = str(point[1])
-
-        #API request
-        url = f'https://maps.googleapis.com/maps/api/place/nearbysearch/json?location={lat}%2C{lon}&type={place_type}&rankby=distance&key={API_key}'
-        response = requests.request("GET", url, headers=headers, data=payload)
+    with open(file_name, 'w') as file:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
         try:
-            request_check(response)
-        except:
-            error_points.append((point[0],point[1]))
-            continue
-
-        #Getting the requested data as a dictionary
-        dict = response.json()
-
-        #Saving the ID of the places obtained from the requested data
-        places = dict['results'] #This is a list of dictionaries, each of them containing info on a specific place
-        with open(file_name, 'a') as file:
-            for place in places:
-                # Save id in the file
-                file.write(str(i)+" "+place["place_id"]+"\n")
-        
-        return error_points
+            #Each point is kept with its request (the grid is iterated only once)
+            requests_in_flight = [(point, executor.submit(_nearby_search_request, point, place_type, API_key, payload, headers)) \
+                                  for point in grid]
+            for i, (point, future) in enumerate(requests_in_flight):
+
+                #API request (the requested data is obtained as a dictionary)
+                try:
+                    data = future.result()
+                    request_check(data)
+                except Exception:
+                    error_points.append((float(point[0]),float(point[1])))
+                    continue
+
+                #Saving the ID of the places obtained from the requested data
+                places = data['results'] #This is a list of dictionaries, each of them containing info on a specific place
+                for place in places:
+                    # Save id in the file
+                    file.write(str(i)+" "+place["place_id"]+"\n")
+        finally:
+            #Do not perform the pending requests if the function is interrupted
+            executor.shutdown(cancel_futures=True)
+
+    return error_points
 
 def get_unique_ids_from_files(files: list[str]) -> list[str]:
 
@@ -199,19 +476,19 @@ def get_unique_ids_from_files(files: list[str]) -> list[str]:
         list[str]: list of unique ids
     """   
 
-    ids = []
+    # Each line of the files is "<grid point index> <id>". The lines are read one by one into a set
+    ids = set()
     for file_name in files:
         with open(file_name, 'r') as file:
-            lines = file.readlines()
-            for line in lines:
-                split_line = line.split()
-                ids.append(split_line[1])
-    return list(set(ids))
+            ids.update(line.split(' ', 1)[1].rstrip() for line in file)
+    return list(ids)
 
 def get_data_from_ids(ids: list[str], \
                       API_key: str, \
-                      payload: dict = {}, \
-                      headers: dict = {}) -> list[str]:
+                      payload: dict = None, \
+                      headers: dict = None, \
+                      fields: list[str] = None, \
+                      max_workers: int = _MAX_WORKERS) -> list[str]:
 
     """This function makes a list of dictionaries from a list of google maps place ids. 
     Each place id is a unique reference of a google maps place. For each place id, 
@@ -222,82 +499,131 @@ def get_data_from_ids(ids: list[str], \
     Args:
         ids (list of strings): List of the requested google maps places ids.
         API_key (str): API key used to perform Nearby Search API requests.
-        payload (dict): Payload used to perform Nearby Search API requests. It is an empty dictionary by default.
-        headers (dict): Headers used to perform Nearby Search API requests. It is an empty dictionary by default.
+        payload (dict): Payload used to perform Nearby Search API requests. It is None (no payload) by default.
+        headers (dict): Headers used to perform Nearby Search API requests. It is None (no headers) by default.
+        fields (list of strings): Place Details fields to request (for instance ['name', 'rating', 'geometry']).
+                                  Requesting only the needed fields reduces the size of the responses and, for some
+                                  fields, the billing of the requests. See full list of fields in this link:
+                                  https://developers.google.com/maps/documentation/places/web-service/details#fields
+                                  All fields are requested by default.
+        max_workers (int): Maximum number of API requests performed at the same time (at most 32). It is 10 by default.
 
     Returns:
         list[str]: List of dictionaries. Each dictionary is the information of each place.
     """  
 
+    #No payload and no headers by default
+    payload = {} if payload is None else payload
+    headers = {} if headers is None else headers
+    _check_max_workers(max_workers)
+
     #Initializing the list of dictionries (each place data is a dictionary)
     list_of_dict = []
 
-    #Requesting complete info for each place id
-    for id in ids:
-        url = f"https://maps.googleapis.com/maps/api/place/details/json?place_id={id}&key={API_key}"
-        payload={}
-        headers = {}
-        response = requests.request("GET", url, headers=headers, data=payload)
-        request_check(response)
-
-        #Getting the requested data as a dictionary
-        dict = response.json()['result']
+    #Each place is requested only once (keeping the order of the ids)
+    ids = list(dict.fromkeys(ids))
 
-        #Adding information in the list of dictionaries
-        list_of_dict.append(dict)
+    #Requesting complete info for each place id
+    #(the requests are performed concurrently, the responses are processed in the ids order)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        results = executor.map(lambda id: _place_details_request(id, API_key, payload, headers, fields), ids)
+        for data in results:
+            request_check(data)
+
+            #Getting the place data as a dictionary
+            place_dict = data['result']
+
+            #Adding information in the list of dictionaries
+            list_of_dict.append(place_dict)
+    finally:
+        #Do not perform the pending requests if a request failed
+        executor.shutdown(cancel_futures=True)
 
     return list_of_dict
 
 def data_from_ids_to_files(ids: list[str], \
                            folder: str, \
                            API_key: str, \
-                           payload: dict = {}, \
-                           headers: dict = {}) -> list[str]:
+                           payload: dict = None, \
+                           headers: dict = None, \
+                           fields: list[str] = None, \
+                           max_workers: int = _MAX_WORKERS) -> list[str]:
 
     """This function makes a list of dictionaries from a list of google maps place ids. 
     Each place id is a unique reference of a google maps place. For each place id, 
     a google maps API request is made to get all information about this place. 
     This information is given by google as a json dictionary. The function stores each
-    dictionary in a file. The files are saved in a folder specified by the user. The function
+    dictionary in a single store (a shelve keyed by place id) saved in a folder specified by the user. 
+    Places already in the store are kept, so the function can be called again with the ids that had problems. 
+    Use pkl_files_to_list_of_dicts() to read the stored dictionaries. The function
     returns a list of the ids that had problems during the google API request.
     
     Args:
         ids (list of strings): List of the requested google maps places ids.
-        folder (str): Path to the folder where the files will be saved (with no final slash)
+        folder (str): Path to the folder where the store will be saved (with no final slash)
         API_key (str): API key used to perform Nearby Search API requests.
-        payload (dict): Payload used to perform Nearby Search API requests. It is an empty dictionary by default.
-        headers (dict): Headers used to perform Nearby Search API requests. It is an empty dictionary by default.
+        payload (dict): Payload used to perform Nearby Search API requests. It is None (no payload) by default.
+        headers (dict): Headers used to perform Nearby Search API requests. It is None (no headers) by default.
+        fields (list of strings): Place Details fields to request (for instance ['name', 'rating', 'geometry']).
+                                  Requesting only the needed fields reduces the size of the responses and, for some
+                                  fields, the billing of the requests. See full list of fields in this link:
+                                  https://developers.google.com/maps/documentation/places/web-service/details#fields
+                                  All fields are requested by default.
+        max_workers (int): Maximum number of API requests performed at the same time (at most 32). It is 10 by default.
 
     Returns:
         list[str]: List of the ids that had problems during the google API request. 
     """  
 
+    #No payload and no headers by default
+    payload = {} if payload is None else payload
+    headers = {} if headers is None else headers
+    _check_max_workers(max_workers)
+
     #ids that raised an error in the google API request
     error_ids = []
 
+    #Each place is requested only once (keeping the order of the ids)
+    ids = list(dict.fromkeys(ids))
+
     #Requesting complete info for each of place id
-    for id in ids:
-        url = f"https://maps.googleapis.com/maps/api/place/details/json?place_id={id}&key={API_key}"
-        payload = {}
-        headers = {}
-        response = requests.request("GET", url, headers=headers, data=payload)
+    #(the requests are performed concurrently, the responses are processed in the ids order)
+    #(the store is opened before any request is performed)
+    with shelve.open(os.path.join(folder, _STORE_NAME)) as store:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
         try:
-            request_check(response)
-        except:
-            error_ids.append(id)
-            continue
+            futures = [executor.submit(_place_details_request, id, API_key, payload, headers, fields) for id in ids]
+            for id, future in zip(ids, futures):
+                try:
+                    data = future.result()
+                    request_check(data)
+                except Exception:
+                    error_ids.append(id)
+                    continue
+
+                #Getting the place data as a dictionary
+                place_dict = data['result']
+
+                #Saving the dictionary in the store
+                store[id] = place_dict
+        finally:
+            #Do not perform the pending requests if the function is interrupted
+            executor.shutdown(cancel_futures=True)
+    return error_ids
 
-        #Getting the requested data as a dictionary
-        dict = response.json()['result']
+def _load_pkl(f_path: str) -> dict:
 
-        #Saving the dictionary in a file
-        with open(folder+'/'+id+'.pkl', 'wb') as file:
-            pickle.dump(dict, file)
-    return error_ids
+    """Loads the dictionary stored in a .pkl file."""
+
+    with open(f_path, 'rb') as file:
+        return pickle.load(file)
 
 def pkl_files_to_list_of_dicts(folder: str):
     
-    """This function extract the dictionaries stored in the .pkl files that are inside a folder. 
+    """This function extract the dictionaries stored in a folder by data_from_ids_to_files(), that is, 
+    the dictionaries of its store and the ones of the .pkl files (one file per place) saved by older versions 
+    of this library.
 
     Args:
         folder (str): Name of the folder.
@@ -306,15 +632,21 @@ def pkl_files_to_list_of_dicts(folder: str):
         list[dict]: List of dictionaries
     """  
 
-    # Get all files in the folder
-    files = [f for f in os.listdir(folder) if os.path.isfile(os.path.join(folder, f))]
-    
-    # Get restaurant dictionaries from files
     list_of_dicts = []
-    for f in files:
-        f_path = os.path.join(folder,f)
-        with open(f_path, 'rb') as file:
-            dictionary = pickle.load(file)
-            list_of_dicts.append(dictionary)
+
+    # Get restaurant dictionaries from the store (if there is one in the folder)
+    store_path = os.path.join(folder, _STORE_NAME)
+    if dbm.whichdb(store_path) is not None:
+        with shelve.open(store_path, 'r') as store:
+            list_of_dicts.extend(store.values())
+
+    # Get the paths of all .pkl files in the folder
+    # (scandir gives the file type and the path of each entry without extra stat calls)
+    with os.scandir(folder) as entries:
+        f_paths = [entry.path for entry in entries if entry.name.endswith('.pkl') and entry.is_file()]
+    
+    # Get restaurant dictionaries from files (the files are read concurrently)
+    with ThreadPoolExecutor(max_workers=_LOAD_WORKERS) as executor:
+        list_of_dicts.extend(executor.map(_load_pkl, f_paths))
     
     return list_of_dicts